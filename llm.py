@@ -4,6 +4,7 @@ import openai
 import psycopg2
 from datetime import datetime
 from dotenv import load_dotenv
+from summary_writer import writer
 import logging
 
 # Configure the logger
@@ -68,6 +69,11 @@ def generate_summary_from_data(user_query):
     )
 
     try:
+        # Summaries still waiting in the write-behind buffer count as stored
+        if writer.lookup(city, city_weather['temp_c'], city_weather['feels_like_c']):
+            logger.info("Duplicate entry pending for city '%s', skipping OpenAI call.", city)
+            return "[-] Entry already exists with the same weather data. Not storing again."
+
         # Connect to DB first to check for duplicates
         conn = psycopg2.connect(DB_URL)
         cursor = conn.cursor()
@@ -80,9 +86,9 @@ def generate_summary_from_data(user_query):
             (city, city_weather['temp_c'], city_weather['feels_like_c'])
         )
         existing = cursor.fetchone()
+        cursor.close()
+        conn.close()
         if existing:
-            cursor.close()
-            conn.close()
             logger.info("Duplicate entry found for city '%s', skipping OpenAI call.", city)
             return "[-] Entry already exists with the same weather data. Not storing again."
 
@@ -96,29 +102,19 @@ def generate_summary_from_data(user_query):
         logger.info("OpenAI API response received. Summary: %s")
         summary = response['choices'][0]['message']['content']
 
-        # Insert into DB
-        logger.info("Inserting summary into database...")
-        cursor = conn.cursor()
-        logger.info("Inserting summary into database for city '%s'.", city)
-        cursor.execute(
-            """
-            INSERT INTO analysis_summaries (city, temperature_c, feels_like_c, wine_recommendation, summary, created_at)
-            VALUES (%s, %s, %s, %s, %s, %s);
-            """,
-            [
-                city,
-                city_weather['temp_c'],
-                city_weather['feels_like_c'],
-                "TBD",  # optionally parse wine from LLM response
-                summary,
-                datetime.utcnow()
-            ]
+        # Hand the row to the write-behind queue; it is batched and committed in the background.
+        # Failed inserts are retried or dead-lettered there, so this only raises with
+        # SUMMARY_DURABILITY=sync (where the summary is not stored, as before)
+        logger.info("Queueing summary for database insert for city '%s'.", city)
+        writer.enqueue(
+            city,
+            city_weather['temp_c'],
+            city_weather['feels_like_c'],
+            "TBD",  # optionally parse wine from LLM response
+            summary,
+            datetime.utcnow()
         )
-        conn.commit()
-        logger.info("Summary inserted into database successfully.")
-        cursor.close()
-        conn.close()
-        logger.info("Summary stored in database for city '%s'.", city)
+        logger.info("Summary queued for city '%s'.", city)
 
         return summary
 
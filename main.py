@@ -1,7 +1,9 @@
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
 from llm import generate_summary_from_data
+from summary_writer import writer
 from typing import Optional
+from datetime import timezone
 import uvicorn
 import psycopg2
 from os import getenv
@@ -18,6 +20,14 @@ app = FastAPI()
 class QueryRequest(BaseModel):
     question: str
 
+
+def _as_naive_utc(timestamp):
+    # Summaries are stamped with datetime.utcnow(); match that if the column is timezone-aware
+    if getattr(timestamp, "tzinfo", None) is not None:
+        return timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return timestamp
+
+
 logger.info("Starting FastAPI application...")
 logger.info("Loading environment variables...")
 logger.info("Getting the post request using the json schema...")
@@ -44,6 +54,9 @@ async def get_results(city: Optional[str] = None):
     Returns stored weather + wine records (optionally filtered by city).
     """
     logger.info("/results endpoint called%s", f" with city: {city}" if city else "")
+    # Read unflushed summaries before the database, so a row committed in between
+    # shows up in at least one of the two
+    pending = writer.pending(city)
     logger.info("Connecting to PostgreSQL database...")
     logger.info("Loading environment variables...")
     logger.info("Loading database URL...")
@@ -68,6 +81,10 @@ async def get_results(city: Optional[str] = None):
 
     logger.info("Processed results into dictionary format.")
     results = [dict(zip(columns, row)) for row in rows]
+    # Unflushed summaries go first; skip any the flusher committed after they were read
+    stored = {(row.get("city"), _as_naive_utc(row.get("created_at")), row.get("summary")) for row in results}
+    pending = [row for row in pending if (row["city"], row["created_at"], row["summary"]) not in stored]
+    results = pending + results
     return {"data": results}
 
 logger.info("Creating /analysis endpoint...")
@@ -78,6 +95,8 @@ async def get_latest_summary(city: Optional[str] = None):
 
     """
     logger.info("/analysis endpoint called%s", f" with city: {city}" if city else "")
+    # Read the newest unflushed summary before the database (see /results)
+    pending = writer.latest(city)
     logger.info("Connecting to PostgreSQL database...")
     logger.info("Loading environment variables...")
     load_dotenv()
@@ -88,10 +107,10 @@ async def get_latest_summary(city: Optional[str] = None):
 
     if city:
         logger.info("Filtering summary by city: %s", city)
-        cursor.execute("SELECT summary FROM analysis_summaries WHERE city = %s ORDER BY created_at DESC LIMIT 1", (city,))
+        cursor.execute("SELECT summary, created_at FROM analysis_summaries WHERE city = %s ORDER BY created_at DESC LIMIT 1", (city,))
     else:
         logger.info("Fetching latest summary without city filter.")
-        cursor.execute("SELECT summary FROM analysis_summaries ORDER BY created_at DESC LIMIT 1")
+        cursor.execute("SELECT summary, created_at FROM analysis_summaries ORDER BY created_at DESC LIMIT 1")
 
     result = cursor.fetchone()
     cursor.close()
@@ -99,8 +118,14 @@ async def get_latest_summary(city: Optional[str] = None):
     logger.info("Fetched summary from the database.")
     logger.info("Closing database connection...")
 
+    # Rows can be written inline while older ones still wait in the write-behind
+    # queue, so take whichever of the two is newest
+    if pending and (not result or pending["created_at"] > _as_naive_utc(result[1])):
+        logger.info("Returning unflushed summary from /analysis endpoint.")
+        return {"summary": pending["summary"]}
+
     logger.info("Returning summary from /analysis endpoint.")
-    logger.info("Summary: %s", result[0])
+    logger.info("Summary: %s", result[0] if result else None)
     return {"summary": result[0] if result else "No summary available."}
 
 
@@ -0,0 +1,306 @@
+import os
+import atexit
+import queue
+import threading
+import time
+import psycopg2
+from psycopg2.extras import execute_values
+from dotenv import load_dotenv
+import logging
+
+# Configure the logger
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+DB_URL = os.getenv("POSTGRES_DB_URL")
+
+# Write-behind tuning (all optional, see .env)
+# async - rows are committed in the background; buffered rows are lost if the
+#         process is killed before they are flushed
+# sync  - every row is committed before enqueue() returns (no write-behind)
+DURABILITY = os.getenv("SUMMARY_DURABILITY", "async")
+BATCH_SIZE = int(os.getenv("SUMMARY_BATCH_SIZE", "50"))
+FLUSH_INTERVAL = float(os.getenv("SUMMARY_FLUSH_INTERVAL", "1.0"))
+QUEUE_SIZE = int(os.getenv("SUMMARY_QUEUE_SIZE", "1000"))
+# What to do when the buffer is full:
+#   block - wait up to ENQUEUE_TIMEOUT for room, then write the row inline
+#   sync  - write the row inline straight away
+#   drop  - log and discard the row
+OVERFLOW_POLICY = os.getenv("SUMMARY_OVERFLOW_POLICY", "block")
+ENQUEUE_TIMEOUT = float(os.getenv("SUMMARY_ENQUEUE_TIMEOUT", "0.5"))
+# Batches failing on connection/transient errors are retried with exponential
+# backoff, starting at FLUSH_INTERVAL and capped at MAX_BACKOFF seconds
+MAX_BACKOFF = float(os.getenv("SUMMARY_MAX_BACKOFF", "30.0"))
+
+# Errors a retry can never fix; rows hitting them are dead-lettered
+POISON_ERRORS = (psycopg2.DataError, psycopg2.IntegrityError)
+
+COLUMNS = ("city", "temperature_c", "feels_like_c", "wine_recommendation", "summary", "created_at")
+INSERT_SQL = (
+    "INSERT INTO analysis_summaries "
+    "(city, temperature_c, feels_like_c, wine_recommendation, summary, created_at) VALUES %s"
+)
+# Put on the queue by shutdown() so a flusher waiting for rows wakes up straight away
+_WAKE = object()
+
+
+class SummaryWriter:
+    """
+    Buffers analysis_summaries rows and inserts them from a background thread,
+    one multi-row INSERT and one commit per batch.
+
+    Rows stay visible through lookup()/latest()/pending() until they are
+    committed, so callers can read their own writes before the flush happens.
+    Rows that can never be inserted are kept in dead_letters (and stay visible)
+    until replay_dead_letters() gets them written.
+    """
+
+    def __init__(self, db_url=DB_URL, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL,
+                 queue_size=QUEUE_SIZE, overflow_policy=OVERFLOW_POLICY, enqueue_timeout=ENQUEUE_TIMEOUT,
+                 max_backoff=MAX_BACKOFF, durability=DURABILITY):
+        if overflow_policy not in ("block", "sync", "drop"):
+            raise ValueError(f"Unknown overflow policy: {overflow_policy}")
+        if durability not in ("async", "sync"):
+            raise ValueError(f"Unknown durability: {durability}")
+        self.db_url = db_url
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow_policy = overflow_policy
+        self.enqueue_timeout = enqueue_timeout
+        self.max_backoff = max_backoff
+        self.durability = durability
+        self.dead_letters = []
+        # Holds (row, holds_slot) pairs; _slots bounds how many new rows it may hold
+        self._queue = queue.Queue()
+        self._slots = threading.BoundedSemaphore(queue_size)
+        self._unflushed = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._closed = False
+        self._thread = None
+
+    def start(self):
+        with self._lock:
+            if self._closed or (self._thread is not None and self._thread.is_alive()):
+                return
+            logger.info("Starting summary writer (batch=%d, interval=%.2fs).", self.batch_size, self.flush_interval)
+            self._thread = threading.Thread(target=self._run, name="summary-writer", daemon=True)
+            self._thread.start()
+
+    def enqueue(self, city, temperature_c, feels_like_c, wine_recommendation, summary, created_at):
+        """
+        Hands a row to the flusher. Returns once the row is readable from the cache,
+        or once it is written inline (buffer full, writer shut down or sync durability).
+
+        Only raises with sync durability; otherwise failed inserts are retried or
+        dead-lettered and the row stays readable.
+        """
+        row = (city, temperature_c, feels_like_c, wine_recommendation, summary, created_at)
+        if self.durability == "sync":
+            self._write([row])
+            return
+
+        self.start()
+        if self.overflow_policy == "block":
+            has_slot = self._slots.acquire(timeout=self.enqueue_timeout)
+        else:
+            has_slot = self._slots.acquire(blocking=False)
+
+        # _closed is checked under the same lock shutdown() sets it with, so a
+        # queued row is always seen by the flusher's final drain
+        with self._lock:
+            closed = self._closed
+            if has_slot and not closed:
+                self._unflushed.append(row)
+                self._queue.put_nowait((row, True))
+                return
+        if has_slot:
+            self._slots.release()
+
+        if closed:
+            logger.warning("Summary writer is shut down, writing row inline.")
+        elif self.overflow_policy == "drop":
+            logger.error("Summary buffer full, dropping summary for city '%s'.", city)
+            return
+        elif self.overflow_policy == "block":
+            logger.warning("Summary buffer still full after %.2fs, writing row inline.", self.enqueue_timeout)
+        else:
+            logger.warning("Summary buffer full, writing row inline.")
+        self._write_inline(row)
+
+    def lookup(self, city, temperature_c, feels_like_c):
+        """
+        Returns the newest unflushed summary for the exact weather reading, or None.
+        """
+        with self._lock:
+            for row in reversed(self._unflushed):
+                if row[0] == city and row[1] == temperature_c and row[2] == feels_like_c:
+                    return row[4]
+        return None
+
+    def latest(self, city=None):
+        """
+        Returns the newest unflushed row (optionally for a city) as a dict, or None.
+        """
+        rows = self.pending(city)
+        return rows[0] if rows else None
+
+    def pending(self, city=None):
+        """
+        Returns unflushed rows as dicts, newest first (optionally for a city).
+        """
+        with self._lock:
+            rows = [row for row in self._unflushed if city is None or row[0] == city]
+        rows.sort(key=lambda row: row[5], reverse=True)
+        return [dict(zip(COLUMNS, row), id=None) for row in rows]
+
+    def replay_dead_letters(self):
+        """
+        Queues dead-lettered rows for another insert, e.g. after fixing the schema.
+        Returns how many rows were queued.
+        """
+        with self._lock:
+            if self._closed:
+                return 0
+            rows, self.dead_letters = self.dead_letters, []
+            for row in rows:
+                self._queue.put_nowait((row, False))
+        if rows:
+            logger.info("Replaying %d dead-lettered summaries.", len(rows))
+            self.start()
+        return len(rows)
+
+    def shutdown(self, timeout=10.0):
+        """
+        Stops the flusher after draining everything still buffered. Rows enqueued
+        afterwards are written inline.
+        """
+        with self._lock:
+            self._closed = True
+            thread = self._thread
+        if thread is not None:
+            logger.info("Shutting down summary writer, flushing buffered rows...")
+            self._stop.set()
+            self._queue.put_nowait(_WAKE)
+            thread.join(timeout)
+            if thread.is_alive():
+                logger.error("Summary writer did not finish flushing within %.1fs.", timeout)
+
+        with self._lock:
+            lost = len(self._unflushed)
+            dead = len(self.dead_letters)
+        if lost:
+            logger.error("%d summaries were not persisted on shutdown (%d dead-lettered).", lost, dead)
+
+    def _run(self):
+        while True:
+            stopping = self._stop.is_set()
+            batch = self._collect(stopping)
+            if batch:
+                self._flush(batch)
+            if stopping and self._queue.empty():
+                return
+
+    def _collect(self, stopping):
+        """
+        Takes up to batch_size rows, waiting at most one flush interval for them
+        unless the writer is stopping.
+        """
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            try:
+                if stopping:
+                    item = self._queue.get_nowait()
+                else:
+                    timeout = deadline - time.monotonic()
+                    if timeout <= 0:
+                        break
+                    item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is _WAKE:
+                break
+            row, holds_slot = item
+            if holds_slot:
+                self._slots.release()
+            batch.append(row)
+        return batch
+
+    def _flush(self, batch):
+        """
+        Inserts a batch. Transient failures are retried with backoff until they
+        succeed or shutdown begins; a data/constraint error splits the batch so
+        only the offending rows are dead-lettered.
+        """
+        delay = self.flush_interval
+        while True:
+            try:
+                self._write(batch)
+                logger.info("Flushed %d summaries to database.", len(batch))
+                self._forget(batch)
+                return
+            except POISON_ERRORS:
+                logger.exception("Batch of %d summaries rejected, writing them one by one.", len(batch))
+                break
+            except Exception:
+                logger.exception("Failed to flush %d summaries, retrying in %.2fs.", len(batch), delay)
+            if self._stop.is_set():
+                # Left in the cache; shutdown() reports them as not persisted
+                return
+            self._stop.wait(delay)
+            delay = min(delay * 2, self.max_backoff)
+
+        for row in batch:
+            try:
+                self._write([row])
+                self._forget([row])
+            except POISON_ERRORS:
+                logger.exception("Dead-lettering summary for city '%s'.", row[0])
+                with self._lock:
+                    self.dead_letters.append(row)
+            except Exception:
+                logger.exception("Failed to write summary for city '%s', requeueing it.", row[0])
+                self._queue.put_nowait((row, False))
+
+    def _write_inline(self, row):
+        """
+        Writes a row on the caller's thread. A failed row is handled like a failed
+        background batch and stays readable from the cache.
+        """
+        try:
+            self._write([row])
+            return
+        except POISON_ERRORS:
+            logger.exception("Inline insert rejected, dead-lettering summary for city '%s'.", row[0])
+            retry = False
+        except Exception:
+            logger.exception("Inline insert failed for city '%s', handing it to the flusher.", row[0])
+            retry = True
+        with self._lock:
+            self._unflushed.append(row)
+            if retry and not self._closed:
+                self._queue.put_nowait((row, False))
+            else:
+                self.dead_letters.append(row)
+
+    def _write(self, rows):
+        conn = psycopg2.connect(self.db_url)
+        try:
+            cursor = conn.cursor()
+            execute_values(cursor, INSERT_SQL, rows)
+            conn.commit()
+            cursor.close()
+        finally:
+            conn.close()
+
+    def _forget(self, rows):
+        with self._lock:
+            for row in rows:
+                self._unflushed.remove(row)
+
+
+writer = SummaryWriter()
+# Flush whatever is still buffered when the process exits
+atexit.register(writer.shutdown)
@@ -1,5 +1,6 @@
 from fastapi.testclient import TestClient
 from unittest.mock import patch, MagicMock
+from datetime import datetime, timezone
 from main import app
 
 client = TestClient(app)
@@ -61,3 +62,65 @@ def test_get_analysis_with_city(mock_connect):
     assert response.status_code == 200
     assert "summary" in response.json()
     assert isinstance(response.json()["summary"], str)
+
+@patch("main.psycopg2.connect")
+@patch("main.writer.pending")
+def test_get_results_pending_first(mock_pending, mock_connect):
+    mock_pending.return_value = [
+        {"id": None, "city": "Paris", "summary": "Warm. A chilled Riesling fits.", "created_at": "2025-04-03 09:00:00"}
+    ]
+    mock_cursor = MagicMock()
+    mock_cursor.fetchall.return_value = [
+        (2, "Paris", "Chilly. A Merlot works well.", "2025-04-02 15:00:00")
+    ]
+    mock_cursor.description = [("id",), ("city",), ("summary",), ("created_at",)]
+    mock_connect.return_value.cursor.return_value = mock_cursor
+
+    response = client.get("/results?city=Paris")
+    assert response.status_code == 200
+    data = response.json()["data"]
+    assert [row["summary"] for row in data] == ["Warm. A chilled Riesling fits.", "Chilly. A Merlot works well."]
+    mock_pending.assert_called_once_with("Paris")
+
+@patch("main.psycopg2.connect")
+@patch("main.writer.pending")
+def test_get_results_skips_pending_already_stored(mock_pending, mock_connect):
+    mock_pending.return_value = [
+        {"id": None, "city": "Paris", "summary": "Warm. A chilled Riesling fits.", "created_at": datetime(2025, 4, 3, 9, 0)}
+    ]
+    mock_cursor = MagicMock()
+    mock_cursor.fetchall.return_value = [
+        (3, "Paris", "Warm. A chilled Riesling fits.", datetime(2025, 4, 3, 9, 0, tzinfo=timezone.utc))
+    ]
+    mock_cursor.description = [("id",), ("city",), ("summary",), ("created_at",)]
+    mock_connect.return_value.cursor.return_value = mock_cursor
+
+    response = client.get("/results?city=Paris")
+    assert response.status_code == 200
+    data = response.json()["data"]
+    assert len(data) == 1
+    assert data[0]["id"] == 3
+
+@patch("main.psycopg2.connect")
+@patch("main.writer.latest")
+def test_get_analysis_pending_newer(mock_latest, mock_connect):
+    mock_latest.return_value = {"summary": "Warm. A chilled Riesling fits.", "created_at": datetime(2025, 4, 3, 9, 0)}
+    mock_cursor = MagicMock()
+    mock_cursor.fetchone.return_value = ("Cloudy. Pinot Noir recommended.", datetime(2025, 4, 2, 15, 0))
+    mock_connect.return_value.cursor.return_value = mock_cursor
+
+    response = client.get("/analysis?city=Paris")
+    assert response.status_code == 200
+    assert response.json()["summary"] == "Warm. A chilled Riesling fits."
+
+@patch("main.psycopg2.connect")
+@patch("main.writer.latest")
+def test_get_analysis_stored_newer(mock_latest, mock_connect):
+    mock_latest.return_value = {"summary": "Warm. A chilled Riesling fits.", "created_at": datetime(2025, 4, 3, 9, 0)}
+    mock_cursor = MagicMock()
+    mock_cursor.fetchone.return_value = ("Cloudy. Pinot Noir recommended.", datetime(2025, 4, 3, 9, 5, tzinfo=timezone.utc))
+    mock_connect.return_value.cursor.return_value = mock_cursor
+
+    response = client.get("/analysis?city=Paris")
+    assert response.status_code == 200
+    assert response.json()["summary"] == "Cloudy. Pinot Noir recommended."
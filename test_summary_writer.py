@@ -0,0 +1,269 @@
+import time
+from datetime import datetime
+from unittest.mock import patch
+import psycopg2
+import pytest
+from summary_writer import SummaryWriter, COLUMNS, INSERT_SQL
+
+
+def make_writer(fail=lambda rows: None, **kwargs):
+    """
+    Builds a SummaryWriter whose _write records batches instead of hitting Postgres.
+    """
+    kwargs.setdefault("batch_size", 10)
+    kwargs.setdefault("flush_interval", 0.05)
+    writer = SummaryWriter("postgresql://test", **kwargs)
+    writer.written = []
+
+    def fake_write(rows):
+        error = fail(rows)
+        if error:
+            raise error
+        writer.written.append(list(rows))
+
+    writer._write = fake_write
+    return writer
+
+
+def make_paused_writer(**kwargs):
+    # No flusher thread, so whatever is queued stays queued
+    kwargs.setdefault("queue_size", 1)
+    writer = make_writer(**kwargs)
+    writer.start = lambda: None
+    return writer
+
+
+def enqueue(writer, summary, city="Paris", minute=0):
+    writer.enqueue(city, 20, 19, "TBD", summary, datetime(2025, 4, 1, 12, minute))
+
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return condition()
+
+
+def summaries(batch):
+    return [row[4] for row in batch]
+
+
+def rejects(summary):
+    # Fails any insert containing the row, like a constraint violation would
+    return lambda rows: psycopg2.IntegrityError("violates check constraint") if summary in summaries(rows) else None
+
+
+def test_flush_at_batch_size():
+    writer = make_writer(batch_size=2, flush_interval=10)
+    enqueue(writer, "a")
+    enqueue(writer, "b")
+
+    assert wait_until(lambda: writer.written)
+    assert summaries(writer.written[0]) == ["a", "b"]
+    assert writer.pending() == []
+    writer.shutdown()
+
+
+def test_flush_at_interval():
+    writer = make_writer(batch_size=10, flush_interval=0.05)
+    enqueue(writer, "a")
+
+    assert wait_until(lambda: writer.written)
+    assert summaries(writer.written[0]) == ["a"]
+    assert writer.pending() == []
+    writer.shutdown()
+
+
+def test_overflow_sync_writes_inline():
+    writer = make_paused_writer(overflow_policy="sync")
+    enqueue(writer, "a")
+    enqueue(writer, "b", minute=1)
+
+    assert [summaries(batch) for batch in writer.written] == [["b"]]
+    assert [row["summary"] for row in writer.pending()] == ["a"]
+
+
+def test_overflow_block_writes_inline_after_timeout():
+    writer = make_paused_writer(overflow_policy="block", enqueue_timeout=0.05)
+    enqueue(writer, "a")
+    started = time.monotonic()
+    enqueue(writer, "b", minute=1)
+
+    assert time.monotonic() - started >= 0.05
+    assert [summaries(batch) for batch in writer.written] == [["b"]]
+    assert [row["summary"] for row in writer.pending()] == ["a"]
+
+
+def test_overflow_drop_discards_row():
+    writer = make_paused_writer(overflow_policy="drop")
+    enqueue(writer, "a")
+    enqueue(writer, "b", city="Rome", minute=1)
+
+    assert writer.written == []
+    assert [row["summary"] for row in writer.pending()] == ["a"]
+    assert writer.lookup("Rome", 20, 19) is None
+
+
+def test_failed_batch_is_retried():
+    attempts = []
+
+    def fail_first(rows):
+        attempts.append(rows)
+        return psycopg2.OperationalError("connection refused") if len(attempts) == 1 else None
+
+    writer = make_writer(fail=fail_first)
+    enqueue(writer, "a")
+
+    assert wait_until(lambda: writer.written)
+    assert len(attempts) == 2
+    assert writer.pending() == []
+    writer.shutdown()
+
+
+def test_outage_is_retried_until_database_recovers():
+    down_until = time.monotonic() + 0.5
+
+    def outage(rows):
+        return psycopg2.OperationalError("server closed the connection") if time.monotonic() < down_until else None
+
+    writer = make_writer(fail=outage, flush_interval=0.05, max_backoff=0.1)
+    enqueue(writer, "a")
+
+    assert wait_until(lambda: writer.written, timeout=3.0)
+    assert summaries(writer.written[0]) == ["a"]
+    assert writer.dead_letters == []
+    assert writer.pending() == []
+    writer.shutdown()
+
+
+def test_bad_row_is_dead_lettered_and_stays_visible():
+    writer = make_writer(fail=rejects("bad"), batch_size=3, flush_interval=10)
+    enqueue(writer, "a")
+    enqueue(writer, "bad", city="Rome", minute=1)
+    enqueue(writer, "b")
+
+    assert wait_until(lambda: writer.dead_letters)
+    written = [summary for batch in writer.written for summary in summaries(batch)]
+    assert sorted(written) == ["a", "b"]
+    assert summaries(writer.dead_letters) == ["bad"]
+    assert [row["summary"] for row in writer.pending()] == ["bad"]
+    assert writer.lookup("Rome", 20, 19) == "bad"
+    writer.shutdown()
+
+
+def test_replay_dead_letters():
+    broken = {"on": True}
+    writer = make_writer(fail=lambda rows: broken["on"] and rejects("bad")(rows))
+    enqueue(writer, "bad")
+    assert wait_until(lambda: writer.dead_letters)
+
+    broken["on"] = False
+    assert writer.replay_dead_letters() == 1
+    assert wait_until(lambda: not writer.pending())
+    assert summaries(writer.written[-1]) == ["bad"]
+    assert writer.dead_letters == []
+    writer.shutdown()
+
+
+def test_failed_inline_write_goes_to_flusher():
+    fail = {"on": True}
+    writer = make_paused_writer(
+        overflow_policy="sync",
+        fail=lambda rows: fail["on"] and psycopg2.OperationalError("connection refused"),
+    )
+    enqueue(writer, "a")
+    enqueue(writer, "b", minute=1)
+
+    assert [row["summary"] for row in writer.pending()] == ["b", "a"]
+    fail["on"] = False
+    del writer.start
+    writer.start()
+    assert wait_until(lambda: not writer.pending())
+    assert sorted(summaries(writer.written[0])) == ["a", "b"]
+    writer.shutdown()
+
+
+def test_sync_durability_writes_before_returning():
+    writer = make_writer(durability="sync")
+    enqueue(writer, "a")
+
+    assert [summaries(batch) for batch in writer.written] == [["a"]]
+    assert writer.pending() == []
+    assert writer._thread is None
+
+
+def test_sync_durability_raises_on_failure():
+    writer = make_writer(durability="sync", fail=lambda rows: psycopg2.OperationalError("connection refused"))
+
+    with pytest.raises(psycopg2.OperationalError):
+        enqueue(writer, "a")
+    assert writer.pending() == []
+
+
+@patch("summary_writer.execute_values")
+@patch("summary_writer.psycopg2.connect")
+def test_write_inserts_batch_and_commits(mock_connect, mock_execute_values):
+    conn = mock_connect.return_value
+    writer = SummaryWriter("postgresql://test", batch_size=2, flush_interval=10)
+    enqueue(writer, "a")
+    enqueue(writer, "b", city="Rome", minute=1)
+
+    assert wait_until(lambda: conn.commit.called)
+    writer.shutdown()
+    mock_connect.assert_called_once_with("postgresql://test")
+    mock_execute_values.assert_called_once_with(conn.cursor.return_value, INSERT_SQL, [
+        ("Paris", 20, 19, "TBD", "a", datetime(2025, 4, 1, 12, 0)),
+        ("Rome", 20, 19, "TBD", "b", datetime(2025, 4, 1, 12, 1)),
+    ])
+    assert INSERT_SQL.startswith(
+        "INSERT INTO analysis_summaries (" + ", ".join(COLUMNS) + ") VALUES"
+    )
+    conn.commit.assert_called_once()
+    conn.cursor.return_value.close.assert_called_once()
+    conn.close.assert_called_once()
+
+
+def test_shutdown_flushes_remaining_rows():
+    writer = make_writer(batch_size=10, flush_interval=10)
+    enqueue(writer, "a")
+    enqueue(writer, "b")
+    writer.shutdown()
+
+    assert [summaries(batch) for batch in writer.written] == [["a", "b"]]
+    assert writer.pending() == []
+    assert not writer._thread.is_alive()
+
+
+def test_enqueue_after_shutdown_writes_inline():
+    writer = make_writer()
+    enqueue(writer, "a")
+    writer.shutdown()
+    enqueue(writer, "b")
+
+    assert summaries(writer.written[-1]) == ["b"]
+    assert writer.pending() == []
+
+
+def test_shutdown_keeps_rows_it_could_not_write():
+    writer = make_writer(fail=lambda rows: psycopg2.OperationalError("connection refused"), flush_interval=10)
+    enqueue(writer, "a")
+    writer.shutdown()
+
+    assert not writer._thread.is_alive()
+    assert [row["summary"] for row in writer.pending()] == ["a"]
+
+
+def test_lookup_and_pending():
+    writer = make_paused_writer(queue_size=10)
+    enqueue(writer, "old", minute=0)
+    enqueue(writer, "rome", city="Rome", minute=1)
+    enqueue(writer, "new", minute=2)
+
+    assert writer.lookup("Paris", 20, 19) == "new"
+    assert writer.lookup("Paris", 21, 19) is None
+    assert [row["summary"] for row in writer.pending()] == ["new", "rome", "old"]
+    assert [row["summary"] for row in writer.pending("Paris")] == ["new", "old"]
+    assert writer.latest("Rome")["summary"] == "rome"
+    assert writer.latest("Berlin") is None